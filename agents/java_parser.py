@@ -6,18 +6,136 @@ for test generation, including methods, classes, dependencies, and structure.
 """
 
 import re
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Union
+
+try:
+    import tree_sitter_java
+    from tree_sitter import Language, Parser
+except ImportError:
+    tree_sitter_java = None
+
+
+# tree-sitter gives a real parse (generics, annotations, nested classes); when
+# it is not installed, parse_java_file falls back to the regex scanner below
+_PARSER = Parser(Language(tree_sitter_java.language())) if tree_sitter_java else None
+
+# Bump whenever extraction rules or the parsed_info layout change, so that
+# parse results cached on disk by earlier versions are not reused. The two
+# backends extract slightly different things, so each has its own cache space.
+PARSER_VERSION = f"7-{'tree-sitter' if _PARSER else 'regex'}"
+
+_VISIBILITY_MODIFIERS = ("public", "private", "protected")
+
+# Declarations whose bodies may contain further members we extract
+_TYPE_BODY_NODES = {
+    "class_declaration", "class_body",
+    "interface_declaration", "interface_body",
+    "enum_declaration", "enum_body", "enum_body_declarations",
+}
+
+# Comments plus string and char literals; blanked out before extraction so
+# their contents can never be mistaken for declarations
+_COMMENT_STRING_RE = re.compile(
+    rb'//[^\n]*|/\*.*?\*/|"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'',
+    re.DOTALL
+)
+_NON_NEWLINE_RE = re.compile(rb'[^\n]')
+
+# Identifier classes in the patterns below include bytes 0x80-0xff so that
+# UTF-8 encoded non-ASCII letters match too; bytes patterns treat \w as ASCII only.
+
+# Searched first, so input without a top-level public class is rejected before
+# the full scan
+_CLASS_RE = re.compile(rb'public\s+(?:(?:abstract|final|static|sealed|non-sealed|strictfp)\s+)*class\s+([\w\x80-\xff]+)')
+
+# Single alternation over every other construct we extract, so the source is
+# scanned once; the outer named group that matched tells parse_java_file what
+# was found.
+# Methods match only up to the opening brace of their body, whose end is then
+# found by _skip_block.
+_ALL_RE = re.compile(
+    rb'(?P<pkg>package\s+(?P<pkg_name>[\w\x80-\xff.]+);)'
+    rb'|(?P<imp>import\s+(?P<imp_name>[\w\x80-\xff.*]+);)'
+    rb'|(?P<method>(?P<method_vis>public|private|protected)\s+(?P<method_ret>[\w\x80-\xff]+)\s+(?P<method_name>[\w\x80-\xff]+)'
+    rb'\s*\([^)]*\)\s*\{)'
+    rb'|(?P<field>(?P<field_vis>private|public|protected)\s+(?P<field_type>[\w\x80-\xff]+)\s+(?P<field_name>[\w\x80-\xff]+);)'
+)
+_BRACE_RE = re.compile(rb'[{}]')
+
+
+class NotAJavaClassError(ValueError):
+    """Raised when the input does not declare a public Java class."""
+
+
+def _blank(match: re.Match) -> bytes:
+    """Replace a match with spaces, keeping newlines so offsets and lines are preserved."""
+    return _NON_NEWLINE_RE.sub(b' ', match.group(0))
+
+
+def _find_top_level_class(content: bytes) -> Optional[re.Match]:
+    """Return the first public class declared outside any braces, like the tree-sitter backend."""
+    depth = 0
+    pos = 0
+    for match in _CLASS_RE.finditer(content):
+        depth += content.count(b'{', pos, match.start()) - content.count(b'}', pos, match.start())
+        pos = match.start()
+        if depth == 0:
+            return match
+    return None
+
+
+def _skip_block(content: bytes, pos: int) -> int:
+    """Return the offset just past the brace closing the block opened before pos."""
+    depth = 1
+    for match in _BRACE_RE.finditer(content, pos):
+        depth += 1 if match.group() == b'{' else -1
+        if depth == 0:
+            return match.end()
+    
+    # Unbalanced braces: treat the rest of the file as the block
+    return len(content)
+
+
+def _node_text(node) -> str:
+    """Source text of a tree-sitter node."""
+    return node.text.decode()
+
+
+def _modifiers(node) -> Optional[Any]:
+    """The modifiers child of a declaration node, if it has one."""
+    return next((c for c in node.children if c.type == "modifiers"), None)
+
+
+def _visibility(node) -> str:
+    """Access modifier of a declaration; "package" when none is given."""
+    modifiers = _modifiers(node)
+    if modifiers is not None:
+        for child in modifiers.children:
+            if child.type in _VISIBILITY_MODIFIERS:
+                return child.type
+    return "package"
+
+
+def _signature_start(node) -> int:
+    """Byte offset where a method signature starts, skipping leading annotations."""
+    modifiers = _modifiers(node)
+    if modifiers is not None:
+        for child in modifiers.children:
+            if not child.type.endswith("annotation"):
+                return child.start_byte
+        return modifiers.end_byte
+    return node.start_byte
 
 
 class JavaParser:
     """Agent for parsing Java source code and extracting testable components."""
     
-    def parse_java_file(self, file_content: str) -> Dict[str, Any]:
+    def parse_java_file(self, file_content: Union[str, bytes]) -> Dict[str, Any]:
         """
         Parse Java source code and extract relevant information.
         
         Args:
-            file_content: Raw Java source code as string
+            file_content: Raw Java source code, preferably as UTF-8 bytes
             
         Returns:
             Dictionary containing parsed information:
@@ -26,61 +144,127 @@ class JavaParser:
             - imports: List of import statements
             - methods: List of method information
             - fields: List of class fields
+            
+        Raises:
+            NotAJavaClassError: If the source does not declare a public class
         """
+        # Both backends work on bytes and decode only the extracted names
+        source = file_content.encode() if isinstance(file_content, str) else file_content
+        
+        if _PARSER is not None:
+            return self._parse_with_tree_sitter(source)
+        return self._parse_with_regex(source)
+    
+    def _parse_with_tree_sitter(self, source: bytes) -> Dict[str, Any]:
+        """Extract parsed_info by walking a tree-sitter syntax tree."""
+        root = _PARSER.parse(source).root_node
+        
+        class_name = None
+        package = None
+        imports: List[str] = []
+        methods: List[Dict[str, Any]] = []
+        fields: List[Dict[str, str]] = []
+        
+        for node in root.named_children:
+            if node.type == "package_declaration" and package is None:
+                package = _node_text(node.named_children[-1])
+            elif node.type == "import_declaration":
+                names = [c for c in node.named_children if c.type != "asterisk"]
+                wildcard = ".*" if any(c.type == "asterisk" for c in node.named_children) else ""
+                imports.append(_node_text(names[-1]) + wildcard)
+            elif node.type == "class_declaration" and class_name is None:
+                if _visibility(node) == "public":
+                    class_name = _node_text(node.child_by_field_name("name"))
+        
+        if class_name is None:
+            raise NotAJavaClassError("not a Java public class")
+        
+        # Walk type bodies in source order without descending into method bodies
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            
+            if node.type == "method_declaration":
+                body = node.child_by_field_name("body")
+                if body is not None:
+                    methods.append({
+                        "name": _node_text(node.child_by_field_name("name")),
+                        "visibility": _visibility(node),
+                        "return_type": _node_text(node.child_by_field_name("type")),
+                        "signature": source[_signature_start(node):body.start_byte].decode().strip()
+                    })
+            elif node.type == "field_declaration":
+                field_type = _node_text(node.child_by_field_name("type"))
+                visibility = _visibility(node)
+                for declarator in node.children_by_field_name("declarator"):
+                    fields.append({
+                        "name": _node_text(declarator.child_by_field_name("name")),
+                        "type": field_type,
+                        "visibility": visibility
+                    })
+            elif node is root or node.type in _TYPE_BODY_NODES:
+                stack.extend(reversed(node.named_children))
+        
         parsed_info = {
-            "class_name": self._extract_class_name(file_content),
-            "package": self._extract_package(file_content),
-            "imports": self._extract_imports(file_content),
-            "methods": self._extract_methods(file_content),
-            "fields": self._extract_fields(file_content)
+            "class_name": class_name,
+            "package": package or "",
+            "imports": imports,
+            "methods": methods,
+            "fields": fields
         }
         
         return parsed_info
     
-    def _extract_class_name(self, content: str) -> str:
-        """Extract the main class name from Java source."""
-        class_pattern = r'public\s+class\s+(\w+)'
-        match = re.search(class_pattern, content)
-        return match.group(1) if match else "UnknownClass"
-    
-    def _extract_package(self, content: str) -> str:
-        """Extract package declaration."""
-        package_pattern = r'package\s+([\w.]+);'
-        match = re.search(package_pattern, content)
-        return match.group(1) if match else ""
-    
-    def _extract_imports(self, content: str) -> List[str]:
-        """Extract all import statements."""
-        import_pattern = r'import\s+([\w.*]+);'
-        return re.findall(import_pattern, content)
-    
-    def _extract_methods(self, content: str) -> List[Dict[str, Any]]:
-        """Extract method signatures and basic information."""
-        method_pattern = r'(public|private|protected)\s+(\w+)\s+(\w+)\s*\([^)]*\)\s*\{[^}]*\}'
-        methods = []
+    def _parse_with_regex(self, source: bytes) -> Dict[str, Any]:
+        """Extract parsed_info with a single regex scan; used when tree-sitter is unavailable."""
+        package = None
+        imports: List[str] = []
+        methods: List[Dict[str, Any]] = []
+        fields: List[Dict[str, str]] = []
         
-        for match in re.finditer(method_pattern, content, re.DOTALL):
-            visibility, return_type, method_name = match.groups()
-            methods.append({
-                "name": method_name,
-                "visibility": visibility,
-                "return_type": return_type,
-                "signature": match.group(0).split('{')[0].strip()
-            })
+        content = _COMMENT_STRING_RE.sub(_blank, source)
         
-        return methods
-    
-    def _extract_fields(self, content: str) -> List[Dict[str, str]]:
-        """Extract class fields/variables."""
-        field_pattern = r'(private|public|protected)\s+(\w+)\s+(\w+);'
-        fields = []
+        # Skip the full scan for input that is not a Java class at all
+        class_match = _find_top_level_class(content)
+        if class_match is None:
+            raise NotAJavaClassError("not a Java public class")
+        class_name = class_match.group(1).decode()
         
-        for match in re.finditer(field_pattern, content):
-            visibility, field_type, field_name = match.groups()
-            fields.append({
-                "name": field_name,
-                "type": field_type,
-                "visibility": visibility
-            })
+        pos = 0
+        while True:
+            match = _ALL_RE.search(content, pos)
+            if match is None:
+                break
+            
+            kind = match.lastgroup
+            pos = match.end()
+            
+            if kind == "method":
+                methods.append({
+                    "name": match.group("method_name").decode(),
+                    "visibility": match.group("method_vis").decode(),
+                    "return_type": match.group("method_ret").decode(),
+                    "signature": match.group("method")[:-1].strip().decode()
+                })
+                # Resume scanning after the method body, balancing nested braces
+                pos = _skip_block(content, pos)
+            elif kind == "field":
+                fields.append({
+                    "name": match.group("field_name").decode(),
+                    "type": match.group("field_type").decode(),
+                    "visibility": match.group("field_vis").decode()
+                })
+            elif kind == "imp":
+                imports.append(match.group("imp_name").decode())
+            elif kind == "pkg" and package is None:
+                package = match.group("pkg_name").decode()
         
-        return fields
\ No newline at end of file
+        parsed_info = {
+            "class_name": class_name,
+            "package": package or "",
+            "imports": imports,
+            "methods": methods,
+            "fields": fields
+        }
+        
+        return parsed_info
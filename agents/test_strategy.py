@@ -5,9 +5,26 @@ Responsible for analyzing parsed Java code and determining the most appropriate
 testing strategies and scenarios for each method and class.
 """
 
+import re
 from typing import Dict, List, Any
 
 
+# Import name fragments that typically indicate a dependency needing mocks
+_MOCK_PATTERNS = {
+    "http": ["HttpClient", "RestTemplate", "WebClient"],
+    "database": ["Repository", "DAO", "EntityManager"],
+    "external_service": ["Service", "Client", "API"],
+    "file_system": ["FileWriter", "FileReader", "Path"]
+}
+_MOCK_RES = {
+    mock_type: re.compile('|'.join(map(re.escape, patterns)))
+    for mock_type, patterns in _MOCK_PATTERNS.items()
+}
+
+_DATABASE_IMPORT_RE = re.compile(r'Database|Connection')
+_FILE_IMPORT_RE = re.compile(r'File|IO')
+
+
 class TestStrategy:
     """Agent for determining test strategies based on parsed Java code."""
     
@@ -96,31 +113,23 @@ class TestStrategy:
             setup_requirements.append("object_initialization")
         
         # Check for common patterns that need setup
-        imports = parsed_info["imports"]
-        if any("Database" in imp or "Connection" in imp for imp in imports):
+        imports = "\n".join(parsed_info["imports"])
+        if _DATABASE_IMPORT_RE.search(imports):
             setup_requirements.append("database_setup")
         
-        if any("File" in imp or "IO" in imp for imp in imports):
+        if _FILE_IMPORT_RE.search(imports):
             setup_requirements.append("file_system_setup")
         
         return setup_requirements
     
     def _analyze_mock_requirements(self, parsed_info: Dict[str, Any]) -> List[str]:
         """Analyze what dependencies need to be mocked."""
-        mock_requirements = []
-        
-        imports = parsed_info["imports"]
+        imports = "\n".join(parsed_info["imports"])
         
         # Common patterns that typically need mocking
-        mock_patterns = {
-            "http": ["HttpClient", "RestTemplate", "WebClient"],
-            "database": ["Repository", "DAO", "EntityManager"],
-            "external_service": ["Service", "Client", "API"],
-            "file_system": ["FileWriter", "FileReader", "Path"]
-        }
-        
-        for mock_type, patterns in mock_patterns.items():
-            if any(any(pattern in imp for pattern in patterns) for imp in imports):
-                mock_requirements.append(mock_type)
+        mock_requirements = [
+            mock_type for mock_type, pattern in _MOCK_RES.items()
+            if pattern.search(imports)
+        ]
         
         return mock_requirements
\ No newline at end of file
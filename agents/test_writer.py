@@ -5,12 +5,220 @@ Responsible for generating actual JUnit test code based on test strategies.
 Uses Claude via AWS Bedrock to generate high-quality test implementations.
 """
 
-from typing import Dict, List, Any
+import json
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple
+
+import boto3
+from botocore.config import Config
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+from config import (
+    AWS_REGION,
+    CLAUDE_MODEL_ID,
+    MAX_TOKENS,
+    BATCH_MAX_TOKENS,
+    API_DELAY_SECONDS,
+    MAX_CONCURRENT_REQUESTS,
+    INDENTATION_SPACES,
+)
+
+
+# Bump whenever prompts or response cleanup change, so that test classes cached
+# on disk by earlier versions are not reused
+WRITER_VERSION = 2
+
+
+# Phrases introducing the code at the start of a line; the rest of that line is removed
+_LEAD_MARKERS = ("Here is the", "Here's the", "The following is the", "Below is the")
+
+# Phrases starting a trailing explanation; from their line to the end is removed.
+# "The" only counts when the same line mentions a method.
+_TAIL_MARKERS = ("Explanation:", "This test", "In this", "Note:", "The")
+
+if ahocorasick is not None:
+    _MARKER_AUTOMATON = ahocorasick.Automaton()
+    for _marker in _LEAD_MARKERS + _TAIL_MARKERS:
+        _MARKER_AUTOMATON.add_word(_marker, _marker)
+    _MARKER_AUTOMATON.make_automaton()
+else:
+    _MARKER_AUTOMATON = None
+    # Longest first, so "The following is the" wins over "The" at the same offset
+    _MARKER_RE = re.compile('|'.join(
+        map(re.escape, sorted(_LEAD_MARKERS + _TAIL_MARKERS, key=len, reverse=True))
+    ))
+
+# Ordered (pattern, replacement) pairs applied by TestWriter._clean_response,
+# the first list before explanations are removed and the second after
+_CODE_FENCE_SUBS = [
+    # Remove markdown code blocks
+    (re.compile(r'```java\s*\n'), ''),
+    (re.compile(r'```\s*$', re.MULTILINE), ''),
+    (re.compile(r'^```.*$', re.MULTILINE), ''),
+]
+
+_CLEANUP_SUBS = [
+    # Remove duplicate method signatures and annotations
+    (re.compile(r'@Test\s*\n\s*void\s+test\w+\(\)\s*\{'), ''),
+    (re.compile(r'@BeforeEach\s*\n\s*void\s+setUp\(\)\s*\{[^}]*\}'), ''),
+    
+    # Remove any remaining markdown formatting
+    (re.compile(r'\*\*(.*?)\*\*'), r'\1'),  # Remove bold
+    (re.compile(r'\*(.*?)\*'), r'\1'),      # Remove italic
+    
+    # Fix malformed statements
+    (re.compile(r'^Arrange:\s*$', re.MULTILINE), f'{INDENTATION_SPACES}// Arrange'),
+    (re.compile(r'^Act:\s*$', re.MULTILINE), f'{INDENTATION_SPACES}// Act'),
+    (re.compile(r'^Assert:\s*$', re.MULTILINE), f'{INDENTATION_SPACES}// Assert'),
+    
+    # Remove standalone opening braces and other non-Java lines
+    (re.compile(r'^\s*\{\s*$', re.MULTILINE), ''),
+    (re.compile(r'^[^/\s].*?[^;{}]\s*$', re.MULTILINE), ''),  # Remove non-Java sentences
+]
+
+# Words marking a cleaned response line as Java code, matched as whole words in one search
+_JAVA_KEYWORDS = (
+    'import', 'package', 'public', 'private', 'protected', 'static', 'final', 'class',
+    'interface', 'if', 'else', 'for', 'while', 'do', 'switch', 'case', 'break',
+    'continue', 'return', 'try', 'catch', 'finally', 'throw', 'throws', 'new',
+    'this', 'super', 'null', 'true', 'false', 'void', 'int', 'double', 'boolean',
+    'String', 'List', 'Map', 'Set', 'assertEquals', 'assertTrue', 'assertFalse',
+    'assertThrows', 'assertNotNull', 'assertNull', 'Calculator',
+    'Arrange', 'Act', 'Assert',
+)
+_KW_RE = re.compile(r'\b(?:' + '|'.join(map(re.escape, _JAVA_KEYWORDS)) + r')\b')
+
+# Shared by the single-test and batched prompts
+_PROMPT_REQUIREMENTS = """
+Requirements:
+1. Return ONLY Java code statements (no @Test annotation, no method signature, no explanations)
+2. Use proper indentation (8 spaces)
+3. Include Arrange-Act-Assert comments
+4. Use Calculator class methods like calculator.add(), calculator.divide(), etc.
+5. Use JUnit 5 assertions: assertEquals(), assertThrows(), assertTrue()
+
+Example format:
+        // Arrange
+        Calculator calculator = new Calculator();
+        int a = 5;
+        int b = 3;
+        
+        // Act
+        int result = calculator.add(a, b);
+        
+        // Assert
+        assertEquals(8, result);
+"""
+
+# One {"name": ..., "body": ...} entry of a batched response, for salvaging malformed JSON
+_BATCH_ENTRY_RE = re.compile(r'"name"\s*:\s*"(?P<name>[^"\\]*)"\s*,\s*"body"\s*:\s*"(?P<body>(?:\\.|[^"\\])*)"')
+
+_print_lock = threading.Lock()
+
+
+def _log(message: str) -> None:
+    """Print a progress line without interleaving output from worker threads."""
+    with _print_lock:
+        print(message, flush=True)
+
+
+def _closing_fence_end(text: str) -> Optional[int]:
+    """Return the offset just past the fence closing the first code block, if it has arrived."""
+    start = text.find('```')
+    if start == -1:
+        return None
+    
+    end = text.find('```', start + 3)
+    return end + 3 if end != -1 else None
+
+
+def _find_markers(response: str) -> List[Tuple[int, str]]:
+    """Return (offset, marker) for every explanation marker, lead markers first at equal offsets."""
+    if _MARKER_AUTOMATON is not None:
+        found = [(end - len(marker) + 1, marker) for end, marker in _MARKER_AUTOMATON.iter(response)]
+    else:
+        found = [(match.start(), match.group()) for match in _MARKER_RE.finditer(response)]
+    
+    return sorted(found, key=lambda item: (item[0], item[1] not in _LEAD_MARKERS))
+
+
+def _remove_explanations(response: str) -> str:
+    """Remove intro phrases and trailing explanations located by one multi-literal scan."""
+    parts = []
+    pos = 0
+    
+    for start, marker in _find_markers(response):
+        if start < pos:
+            continue
+        
+        # Markers only count at the start of a line, never inside code such as
+        # a string literal or comment
+        line_start = response.rfind('\n', 0, start)
+        indent = response[line_start + 1:start]
+        if indent and not indent.isspace():
+            continue
+        
+        line_end = response.find('\n', start)
+        if line_end == -1:
+            line_end = len(response)
+        
+        if marker in _LEAD_MARKERS:
+            parts.append(response[pos:start])
+            pos = line_end
+            continue
+        
+        # Trailing explanations must not be on the first line
+        if line_start == -1:
+            continue
+        if marker == "The" and "method" not in response[start:line_end]:
+            continue
+        
+        # Blank lines before the explanation go too; this walk runs at most once,
+        # since everything from here on is removed
+        cut = line_start
+        while cut > pos and response[cut - 1].isspace():
+            cut -= 1
+        cut = response.find('\n', cut, line_start + 1)
+        
+        parts.append(response[pos:cut])
+        pos = len(response)
+        break
+    
+    parts.append(response[pos:])
+    return ''.join(parts)
+
+
+class _RateLimiter:
+    """Allows at most max_calls calls to start within any period-second window."""
+    
+    def __init__(self, max_calls: int, period: float):
+        self._slots = threading.BoundedSemaphore(max_calls)
+        self._period = period
+    
+    def acquire(self) -> None:
+        """Block until a slot is free; the slot is handed back period seconds later."""
+        self._slots.acquire()
+        timer = threading.Timer(self._period, self._slots.release)
+        timer.daemon = True
+        timer.start()
 
 
 class TestWriter:
     """Agent for generating JUnit test code from test strategies."""
     
+    def __init__(self):
+        # Set when any test body fell back to the TODO template
+        self.used_template_fallback = False
+        self._rate_limiter = _RateLimiter(MAX_CONCURRENT_REQUESTS, API_DELAY_SECONDS)
+        self._bedrock = None
+        self._bedrock_lock = threading.Lock()
+    
     def generate_test_code(self, test_strategies: Dict[str, Any], parsed_info: Dict[str, Any]) -> str:
         """
         Generate complete JUnit test class code.
@@ -22,6 +230,7 @@ class TestWriter:
         Returns:
             Complete JUnit test class as string
         """
+        self.used_template_fallback = False
         test_class = self._build_test_class_structure(test_strategies, parsed_info)
         return test_class
     
@@ -77,46 +286,105 @@ class TestWriter:
         if not setup_requirements:
             return ""
         
-        setup_code = """
+        parts = ["""
     @BeforeEach
     void setUp() {
         // Initialize test objects and dependencies
-"""
+"""]
         
         if "object_initialization" in setup_requirements:
-            setup_code += "        // TODO: Initialize class under test\n"
+            parts.append("        // TODO: Initialize class under test\n")
         
         if "database_setup" in setup_requirements:
-            setup_code += "        // TODO: Set up database mocks/test data\n"
+            parts.append("        // TODO: Set up database mocks/test data\n")
         
         if "file_system_setup" in setup_requirements:
-            setup_code += "        // TODO: Set up file system test environment\n"
+            parts.append("        // TODO: Set up file system test environment\n")
         
-        setup_code += "    }\n"
+        parts.append("    }\n")
         
-        return setup_code
+        return "".join(parts)
     
     def _generate_test_methods(self, test_methods: List[Dict[str, Any]]) -> str:
         """Generate individual test methods."""
-        methods = []
-        
+        # Overloaded methods yield test cases with the same name and prompt; ask for each once
+        unique_tests: Dict[str, Dict[str, Any]] = {}
         for test_method in test_methods:
-            method_code = self._generate_single_test_method(test_method)
-            methods.append(method_code)
+            unique_tests.setdefault(test_method["test_name"], test_method)
+        
+        # One batched request covers every test; anything it misses is generated per test
+        implementations = self._generate_batched_implementations(list(unique_tests.values()))
+        missing = [t for t in unique_tests.values() if t["test_name"] not in implementations]
+        
+        if missing:
+            # Bedrock calls are network-bound, so run them concurrently; map keeps test order
+            with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_REQUESTS) as executor:
+                generated = executor.map(self._generate_single_test_implementation, missing)
+                implementations.update(zip((t["test_name"] for t in missing), generated))
+        
+        methods = [
+            self._format_test_method(test_method, implementations[test_method["test_name"]])
+            for test_method in test_methods
+        ]
         
         return "\n".join(methods)
     
-    def _generate_single_test_method(self, test_method: Dict[str, Any]) -> str:
-        """Generate a single test method."""
-        test_name = test_method["test_name"]
-        description = test_method["description"]
-        test_type = test_method["test_type"]
+    def _generate_batched_implementations(self, test_methods: List[Dict[str, Any]]) -> Dict[str, str]:
+        """Generate all test implementations with one Bedrock request, keyed by test name."""
+        if not test_methods:
+            return {}
         
-        print(f"  Generating test: {test_name}")
+        _log(f"  Generating {len(test_methods)} tests in one request...")
+        try:
+            prompt = self._build_batch_generation_prompt(test_methods)
+            raw_response = self._invoke_claude(prompt, BATCH_MAX_TOKENS)
+        except Exception as e:
+            _log(f"    Warning: batched Bedrock request failed - {e} (generating tests individually)")
+            return {}
+        
+        wanted = {t["test_name"] for t in test_methods}
+        implementations = {}
+        for test_name, body in self._parse_batch_response(raw_response).items():
+            cleaned = self._clean_response(body)
+            if test_name in wanted and cleaned.strip():
+                implementations[test_name] = cleaned
+        
+        _log(f"    Batched request returned {len(implementations)} of {len(wanted)} tests")
+        return implementations
+    
+    def _parse_batch_response(self, raw_response: str) -> Dict[str, str]:
+        """Extract test name to body pairs from a batched response, tolerating malformed JSON."""
+        start, end = raw_response.find('{'), raw_response.rfind('}')
+        try:
+            tests = json.loads(raw_response[start:end + 1])["tests"]
+            return {
+                test["name"]: test["body"] for test in tests
+                if isinstance(test.get("name"), str) and isinstance(test.get("body"), str)
+            }
+        except (ValueError, KeyError, TypeError, AttributeError):
+            pass
+        
+        # Salvage whatever complete entries exist, e.g. from a truncated response
+        bodies = {}
+        for match in _BATCH_ENTRY_RE.finditer(raw_response):
+            try:
+                bodies[match.group("name")] = json.loads(f'"{match.group("body")}"')
+            except ValueError:
+                continue
+        return bodies
+    
+    def _generate_single_test_implementation(self, test_method: Dict[str, Any]) -> str:
+        """Generate the body of a single test method with its own Bedrock request."""
+        _log(f"  Generating test: {test_method['test_name']}")
         
         # Use Claude to generate the actual test implementation
         prompt = self._build_test_generation_prompt(test_method)
-        test_implementation = self._generate_test_implementation(prompt)
+        return self._generate_test_implementation(prompt)
+    
+    def _format_test_method(self, test_method: Dict[str, Any], test_implementation: str) -> str:
+        """Wrap a generated test body in its @Test method declaration."""
+        test_name = test_method["test_name"]
+        description = test_method["description"]
         
         method_code = f"""
     @Test
@@ -135,67 +403,103 @@ Generate only the Java method body code for this test case:
 Test: {test_method['test_name']}
 Type: {test_method['test_type']}
 Description: {test_method['description']}
-
-Requirements:
-1. Return ONLY Java code statements (no @Test annotation, no method signature, no explanations)
-2. Use proper indentation (8 spaces)
-3. Include Arrange-Act-Assert comments
-4. Use Calculator class methods like calculator.add(), calculator.divide(), etc.
-5. Use JUnit 5 assertions: assertEquals(), assertThrows(), assertTrue()
-
-Example format:
-        // Arrange
-        Calculator calculator = new Calculator();
-        int a = 5;
-        int b = 3;
-        
-        // Act
-        int result = calculator.add(a, b);
+{_PROMPT_REQUIREMENTS}"""
+        return prompt
+    
+    def _build_batch_generation_prompt(self, test_methods: List[Dict[str, Any]]) -> str:
+        """Build prompt for Claude to generate every test implementation in one response."""
+        test_cases = "\n".join(
+            f"""{i}. Test: {test_method['test_name']}
+   Type: {test_method['test_type']}
+   Description: {test_method['description']}"""
+            for i, test_method in enumerate(test_methods, 1)
+        )
         
-        // Assert
-        assertEquals(8, result);
+        prompt = f"""
+Generate only the Java method body code for each of these test cases:
+
+{test_cases}
+{_PROMPT_REQUIREMENTS}
+Respond with ONLY a JSON object with one entry per test case, in this exact format:
+{{"tests": [{{"name": "<test name>", "body": "<Java method body code>"}}]}}
 """
         return prompt
     
+    def _get_client(self):
+        """Return the shared Bedrock runtime client, creating it on first use."""
+        # Client creation is not thread-safe, unlike the client itself
+        with self._bedrock_lock:
+            if self._bedrock is None:
+                self._bedrock = boto3.client(
+                    'bedrock-runtime',
+                    region_name=AWS_REGION,
+                    config=Config(retries={'mode': 'adaptive'})
+                )
+        return self._bedrock
+    
+    def _invoke_claude(self, prompt: str, max_tokens: int, stop_at_fence: bool = False) -> str:
+        """
+        Send a single-message prompt to Claude via AWS Bedrock and return the reply text.
+        
+        With stop_at_fence, streaming stops as soon as the first fenced code block
+        closes. Only use it when that block is the whole answer; a batched JSON reply
+        may contain fences inside its bodies.
+        """
+        bedrock = self._get_client()
+        
+        # Throttle request starts instead of sleeping after every call
+        self._rate_limiter.acquire()
+        
+        response = bedrock.invoke_model_with_response_stream(
+            modelId=CLAUDE_MODEL_ID,
+            body=json.dumps({
+                'anthropic_version': 'bedrock-2023-05-31',
+                'max_tokens': max_tokens,
+                'messages': [{'role': 'user', 'content': prompt}]
+            })
+        )
+        
+        stream = response['body']
+        chunks = []
+        try:
+            for event in stream:
+                if 'chunk' not in event:
+                    continue
+                
+                chunk = json.loads(event['chunk']['bytes'])
+                if chunk.get('type') != 'content_block_delta':
+                    continue
+                
+                text = chunk['delta'].get('text', '')
+                chunks.append(text)
+                
+                # Stop once the code block closes; the prose after it is discarded anyway
+                if stop_at_fence and '`' in text:
+                    reply = ''.join(chunks)
+                    end = _closing_fence_end(reply)
+                    if end is not None:
+                        return reply[:end]
+        finally:
+            stream.close()
+        
+        return ''.join(chunks)
+    
     def _generate_test_implementation(self, prompt: str) -> str:
         """
         Generate test implementation using Claude via AWS Bedrock.
         """
-        import boto3
-        import json
-        import time
-        
         try:
-            from config import AWS_REGION, CLAUDE_MODEL_ID, MAX_TOKENS, API_DELAY_SECONDS
-            
-            print("    → Generating test implementation with Claude...", end=" ", flush=True)
-            bedrock = boto3.client('bedrock-runtime', region_name=AWS_REGION)
-            
-            response = bedrock.invoke_model(
-                modelId=CLAUDE_MODEL_ID,
-                body=json.dumps({
-                    'anthropic_version': 'bedrock-2023-05-31',
-                    'max_tokens': MAX_TOKENS,
-                    'messages': [{'role': 'user', 'content': prompt}]
-                })
-            )
-            
-            response_body = json.loads(response['body'].read())
-            print("✓")
-            
-            # Add delay to avoid throttling
-            time.sleep(API_DELAY_SECONDS)
+            raw_response = self._invoke_claude(prompt, MAX_TOKENS, stop_at_fence=True)
             
             # Clean up the response to remove markdown formatting
-            raw_response = response_body['content'][0]['text']
             cleaned_response = self._clean_response(raw_response)
             
             return cleaned_response
             
         except Exception as e:
             # Fallback to template if Bedrock fails
-            print(f"✗ (using template)")
-            print(f"    Warning: Bedrock API failed - {e}")
+            self.used_template_fallback = True
+            _log(f"    Warning: Bedrock API failed - {e} (using template)")
             return """        // Arrange
         // TODO: Set up test data and dependencies
         
@@ -208,59 +512,18 @@ Example format:
     
     def _clean_response(self, response: str) -> str:
         """Clean Claude's response to remove markdown formatting and extract only Java code."""
-        import re
-        from config import INDENTATION_SPACES
-        
-        # Remove markdown code blocks
-        response = re.sub(r'```java\s*\n', '', response)
-        response = re.sub(r'```\s*$', '', response, flags=re.MULTILINE)
-        response = re.sub(r'^```.*$', '', response, flags=re.MULTILINE)
+        for pattern, replacement in _CODE_FENCE_SUBS:
+            response = pattern.sub(replacement, response)
         
         # Remove ALL explanation text and intro phrases (more aggressive)
-        patterns_to_remove = [
-            r'Here is the Java method body code.*?:',
-            r'Here\'s the Java method body code.*?:',
-            r'Here is the.*?implementation.*?:',
-            r'Here\'s the.*?implementation.*?:',
-            r'The following is the.*?:',
-            r'Below is the.*?:',
-            r'\n\s*Explanation:.*$',
-            r'\n\s*This test.*$',
-            r'\n\s*In this.*$',
-            r'\n\s*Note:.*$',
-            r'\n\s*The.*?method.*$',
-        ]
-        
-        for pattern in patterns_to_remove:
-            response = re.sub(pattern, '', response, flags=re.DOTALL)
-        
-        # Remove duplicate method signatures and annotations
-        response = re.sub(r'@Test\s*\n\s*void\s+test\w+\(\)\s*\{', '', response)
-        response = re.sub(r'@BeforeEach\s*\n\s*void\s+setUp\(\)\s*\{[^}]*\}', '', response)
-        
-        # Remove any remaining markdown formatting
-        response = re.sub(r'\*\*(.*?)\*\*', r'\1', response)  # Remove bold
-        response = re.sub(r'\*(.*?)\*', r'\1', response)      # Remove italic
-        
-        # Fix malformed statements
-        response = re.sub(r'^Arrange:\s*$', f'{INDENTATION_SPACES}// Arrange', response, flags=re.MULTILINE)
-        response = re.sub(r'^Act:\s*$', f'{INDENTATION_SPACES}// Act', response, flags=re.MULTILINE)
-        response = re.sub(r'^Assert:\s*$', f'{INDENTATION_SPACES}// Assert', response, flags=re.MULTILINE)
+        response = _remove_explanations(response)
         
-        # Remove standalone opening braces and other non-Java lines
-        response = re.sub(r'^\s*\{\s*$', '', response, flags=re.MULTILINE)
-        response = re.sub(r'^[^/\s].*?[^;{}]\s*$', '', response, flags=re.MULTILINE)  # Remove non-Java sentences
+        for pattern, replacement in _CLEANUP_SUBS:
+            response = pattern.sub(replacement, response)
         
         # Clean up and ensure proper Java formatting
         lines = response.split('\n')
         cleaned_lines = []
-        java_keywords = ['import', 'package', 'public', 'private', 'protected', 'static', 'final', 'class', 
-                        'interface', 'if', 'else', 'for', 'while', 'do', 'switch', 'case', 'break', 
-                        'continue', 'return', 'try', 'catch', 'finally', 'throw', 'throws', 'new', 
-                        'this', 'super', 'null', 'true', 'false', 'void', 'int', 'double', 'boolean',
-                        'String', 'List', 'Map', 'Set', 'assertEquals', 'assertTrue', 'assertFalse',
-                        'assertThrows', 'assertNotNull', 'assertNull', 'Calculator', '//', '/*', '*/',
-                        'Arrange', 'Act', 'Assert']
         
         for line in lines:
             stripped = line.strip()
@@ -269,11 +532,9 @@ Example format:
                 continue
                 
             # Keep lines that are clearly Java code
-            if (stripped.startswith('//') or 
-                stripped.endswith(';') or 
-                stripped.endswith('{') or 
-                stripped.endswith('}') or
-                any(keyword in stripped for keyword in java_keywords) or
+            if (stripped.startswith(('//', '/*')) or 
+                stripped.endswith(('*/', ';', '{', '}')) or
+                _KW_RE.search(stripped) is not None or
                 '=' in stripped or
                 '(' in stripped):
                 
@@ -6,11 +6,14 @@ Configuration settings for Java Test Writer Assistant
 AWS_REGION = "ap-southeast-2"
 CLAUDE_MODEL_ID = "anthropic.claude-3-haiku-20240307-v1:0"
 MAX_TOKENS = 1000
+BATCH_MAX_TOKENS = 4096  # Single request generating every test body of a class
 API_DELAY_SECONDS = 10
+MAX_CONCURRENT_REQUESTS = 8  # Also the number of requests allowed to start per API_DELAY_SECONDS
 
 # Project Settings
 DEFAULT_OUTPUT_DIR = "outputs"
 SAMPLE_INPUT_DIR = "sample_inputs"
+CACHE_DIR = "~/.cache/java-test-writer"
 
 # Test Generation Settings
 INDENTATION_SPACES = "        "  # 8 spaces for method body
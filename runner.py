@@ -7,42 +7,55 @@ from Java source code using Claude via AWS Bedrock.
 """
 
 import argparse
+import hashlib
 import os
+import pickle
 import sys
+import tempfile
 from pathlib import Path
+from typing import BinaryIO, Dict, Any, Optional
 
-from agents.java_parser import JavaParser
+from agents.java_parser import JavaParser, NotAJavaClassError, PARSER_VERSION
 from agents.test_strategy import TestStrategy
-from agents.test_writer import TestWriter
+from agents.test_writer import TestWriter, WRITER_VERSION
+from config import CACHE_DIR, CLAUDE_MODEL_ID
+
+
+# Keys every parsed_info dict must have for a cached parse result to be used
+_PARSED_INFO_KEYS = {"class_name", "package", "imports", "methods", "fields"}
 
 
 class TestGeneratorOrchestrator:
     """Main orchestrator for the test generation pipeline."""
     
-    def __init__(self):
+    def __init__(self, use_cache: bool = True, force: bool = False):
+        self.use_cache = use_cache
+        self.force = force
+        self.cache_dir = os.path.expanduser(CACHE_DIR)
         self.java_parser = JavaParser()
         self.test_strategy = TestStrategy()
         self.test_writer = TestWriter()
     
-    def generate_tests(self, input_file: str, output_dir: str = "outputs") -> str:
+    def generate_tests(self, input_file: BinaryIO, output_dir: str = "outputs") -> str:
         """
         Generate JUnit tests for a Java source file.
         
         Args:
-            input_file: Path to Java source file
+            input_file: Java source file, already opened in binary mode
             output_dir: Directory to write generated test file
             
         Returns:
             Path to generated test file
         """
-        print(f"Processing Java file: {input_file}")
+        print(f"Processing Java file: {input_file.name}")
         
         # Step 1: Parse Java source code
         print("Step 1: Parsing Java source code...")
-        with open(input_file, 'r') as f:
-            java_content = f.read()
+        # Kept as bytes: hashing and parsing both work on bytes directly
+        java_source = input_file.read()
         
-        parsed_info = self.java_parser.parse_java_file(java_content)
+        source_key = hashlib.sha256(java_source).hexdigest()
+        parsed_info = self._parse_java(java_source, source_key)
         print(f"Found class: {parsed_info['class_name']}")
         print(f"Found {len(parsed_info['methods'])} methods")
         
@@ -51,9 +64,17 @@ class TestGeneratorOrchestrator:
         test_strategies = self.test_strategy.generate_test_strategies(parsed_info)
         print(f"Generated {len(test_strategies['test_methods'])} test cases")
         
-        # Step 3: Generate test code
-        print("Step 3: Generating JUnit test code...")
-        test_code = self.test_writer.generate_test_code(test_strategies, parsed_info)
+        # Step 3: Generate test code, reusing the previous result for unchanged source
+        test_code = self._load_cached_tests(source_key)
+        if test_code is not None:
+            print("Step 3: Using cached JUnit test code (use --force to regenerate)")
+        else:
+            print("Step 3: Generating JUnit test code...")
+            test_code = self.test_writer.generate_test_code(test_strategies, parsed_info)
+            
+            # Never cache template fallbacks, so a failed Bedrock call is retried next run
+            if self.use_cache and not self.test_writer.used_template_fallback:
+                self._write_cache_file(self._tests_cache_file(source_key), test_code.encode('utf-8'))
         
         # Step 4: Write output file
         output_path = self._write_test_file(test_code, test_strategies['test_class_name'], output_dir)
@@ -61,6 +82,61 @@ class TestGeneratorOrchestrator:
         
         return output_path
     
+    def _parse_java(self, java_source: bytes, source_key: str) -> Dict[str, Any]:
+        """Parse Java source, reusing the on-disk result for identical content."""
+        if not self.use_cache:
+            return self.java_parser.parse_java_file(java_source)
+        
+        cache_file = os.path.join(self.cache_dir, "parse", f"v{PARSER_VERSION}", f"{source_key}.pkl")
+        try:
+            with open(cache_file, 'rb') as f:
+                parsed_info = pickle.load(f)
+        except Exception:
+            # Missing or unreadable entries (bad protocol, stale globals, ...) are misses
+            parsed_info = None
+        
+        if isinstance(parsed_info, dict) and _PARSED_INFO_KEYS <= parsed_info.keys():
+            print("Using cached parse result")
+            return parsed_info
+        
+        parsed_info = self.java_parser.parse_java_file(java_source)
+        self._write_cache_file(cache_file, pickle.dumps(parsed_info))
+        return parsed_info
+    
+    def _tests_cache_file(self, source_key: str) -> str:
+        """Path of the cached test class generated for a given source hash."""
+        # Generated code also depends on the parser, the prompts and cleanup, and the model
+        model_key = hashlib.sha256(CLAUDE_MODEL_ID.encode()).hexdigest()[:16]
+        return os.path.join(
+            self.cache_dir, "tests", f"v{PARSER_VERSION}-w{WRITER_VERSION}", model_key, f"{source_key}.java"
+        )
+    
+    def _load_cached_tests(self, source_key: str) -> Optional[str]:
+        """Return previously generated test code for this source, if any."""
+        if not self.use_cache or self.force:
+            return None
+        
+        try:
+            with open(self._tests_cache_file(source_key), 'r', encoding='utf-8') as f:
+                return f.read()
+        except OSError:
+            return None
+    
+    def _write_cache_file(self, cache_file: str, data: bytes) -> None:
+        """Atomically write a cache entry; caching failures never abort a run."""
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_file))
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, cache_file)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            print(f"Warning: could not write cache file {cache_file} - {e}")
+    
     def _write_test_file(self, test_code: str, test_class_name: str, output_dir: str) -> str:
         """Write generated test code to file."""
         os.makedirs(output_dir, exist_ok=True)
@@ -86,6 +162,16 @@ def main():
         default="outputs",
         help="Output directory for generated tests (default: outputs)"
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not read or write the on-disk parse and test caches"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Regenerate tests even if cached tests exist for this source"
+    )
     parser.add_argument(
         "--debug",
         action="store_true",
@@ -94,19 +180,25 @@ def main():
     
     args = parser.parse_args()
     
-    # Validate input file
-    if not os.path.exists(args.input_file):
-        print(f"Error: Input file '{args.input_file}' not found", file=sys.stderr)
+    # Validate input file; opening it doubles as the existence check
+    if os.path.splitext(args.input_file)[1] != '.java':
+        print(f"Error: Input file must be a Java source file (.java)", file=sys.stderr)
         sys.exit(1)
     
-    if not args.input_file.endswith('.java'):
-        print(f"Error: Input file must be a Java source file (.java)", file=sys.stderr)
+    try:
+        input_file = open(args.input_file, 'rb')
+    except FileNotFoundError:
+        print(f"Error: Input file '{args.input_file}' not found", file=sys.stderr)
+        sys.exit(1)
+    except OSError as e:
+        print(f"Error: Cannot open input file '{args.input_file}': {e.strerror}", file=sys.stderr)
         sys.exit(1)
     
     try:
         # Initialize orchestrator and generate tests
-        orchestrator = TestGeneratorOrchestrator()
-        output_file = orchestrator.generate_tests(args.input_file, args.output)
+        with input_file:
+            orchestrator = TestGeneratorOrchestrator(use_cache=not args.no_cache, force=args.force)
+            output_file = orchestrator.generate_tests(input_file, args.output)
         
         print(f"\n✅ Successfully generated test file: {output_file}")
         print("\nNext steps:")
@@ -114,6 +206,9 @@ def main():
         print("2. Add specific test data and assertions")
         print("3. Configure AWS Bedrock credentials for AI-enhanced test generation")
         
+    except NotAJavaClassError as e:
+        print(f"Error: Input file '{args.input_file}' is {e}", file=sys.stderr)
+        sys.exit(1)
     except Exception as e:
         print(f"Error generating tests: {e}", file=sys.stderr)
         if args.debug: